@@ -2,11 +2,13 @@
 import sys
 import json
 import serial
+from serial.tools import list_ports
 import threading
 import time
 import webbrowser
+from collections import deque
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-import pandas as pd
 import numpy as np
 from PyQt5.QtWidgets import *
 from PyQt5.QtCore import *
@@ -14,11 +16,44 @@ from PyQt5.QtGui import *
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
+import matplotlib.dates as mdates
 import seaborn as sns
+from parse_flat import parse, precompilar_parse, EVENTO_RIEGO_INICIADO
+from stats_kernels import summarize, resumen, precompilar_estadisticas, NUM_BINS
+
+# Número de muestras retenidas por canal
+MAX_MUESTRAS = 100
+
+# Número de eventos de bomba retenidos en el historial
+MAX_EVENTOS = 200
+
+# Margen (°C) alrededor del rango de temperatura en su gráfico
+MARGEN_TEMPERATURA = 2
+
+@dataclass(frozen=True, slots=True)
+class Snapshot:
+    """Copia inmutable de los datos del hilo de recolección para la UI"""
+    hum_ts: np.ndarray
+    hum_view: np.ndarray
+    temp_ts: np.ndarray
+    temp_view: np.ndarray
+    hum_hist: np.ndarray
+    stats: dict
+    t0_wall: float
+
+def precompilar_kernels():
+    """Compila los kernels Numba sin bloquear la UI ni la primera lectura serial"""
+    precompilar_parse()
+    precompilar_estadisticas()
+
+def epoch_a_fechas(ts, t0=0.0):
+    """Convierte segundos (relativos al epoch t0) a datetime64 en hora local"""
+    offset = t0 + datetime.now().astimezone().utcoffset().total_seconds()
+    return ((np.asarray(ts, dtype='float64') + offset) * 1e6).astype('datetime64[us]')
 
 class DataCollectorThread(QThread):
     """Hilo para recolección de datos del Arduino"""
-    data_updated = pyqtSignal(dict)
+    data_updated = pyqtSignal(np.ndarray, np.ndarray, object)  # humedad, temperatura, Snapshot
     status_updated = pyqtSignal(str)
     error_occurred = pyqtSignal(str)
     
@@ -27,17 +62,42 @@ class DataCollectorThread(QThread):
         self.puerto = puerto
         self.baudrate = baudrate
         self.running = False
+        self._detenido = False  # True cuando stop() pidió detener la recolección
         self.serial_conn = None
-        self.datos = {
-            'humedad': [],
-            'temperatura': [],
-            'eventos': [],
-            'estadisticas': {
-                'total_riegos': 0,
-                'humedad_promedio': 0,
-                'temperatura_promedio': 0,
-                'ultimo_riego': None
-            }
+        
+        # Protege buffers y snapshot entre el hilo de recolección y la UI
+        self.mutex = QMutex()
+        self.hay_datos_nuevos = False
+        
+        # Referencia de tiempo: las muestras guardan segundos monotónicos desde t0
+        self.t0_wall = time.time()
+        self.t0_mono = time.monotonic()
+        
+        # Buffers circulares (SoA): marcas de tiempo y valores por canal
+        self.hum_ts = np.zeros(MAX_MUESTRAS, dtype='float64')
+        self.hum_val = np.zeros(MAX_MUESTRAS, dtype='float32')
+        self.hum_head = 0
+        self.hum_count = 0
+        
+        self.temp_ts = np.zeros(MAX_MUESTRAS, dtype='float64')
+        self.temp_val = np.zeros(MAX_MUESTRAS, dtype='float32')
+        self.temp_head = 0
+        self.temp_count = 0
+        
+        # Histograma de humedad (lo rellena summarize)
+        self.hum_hist = np.zeros(NUM_BINS, dtype='int64')
+        
+        # Historial acotado de eventos (t, código EVENTO_*), separado de los contadores
+        self.eventos = deque(maxlen=MAX_EVENTOS)
+        self.estadisticas = {
+            'total_riegos': 0,
+            'humedad_promedio': 0,
+            'humedad_min': 0,
+            'humedad_max': 0,
+            'temperatura_promedio': 0,
+            'temperatura_min': 0,
+            'temperatura_max': 0,
+            'ultimo_riego': None
         }
         
     def run(self):
@@ -45,87 +105,128 @@ class DataCollectorThread(QThread):
         try:
             self.serial_conn = serial.Serial(self.puerto, self.baudrate, timeout=1)
             self.running = True
+            self.t0_wall = time.time()
+            self.t0_mono = time.monotonic()
             self.status_updated.emit(f"✅ Conectado a {self.puerto}")
             
+            # Lectura bloqueante (timeout del puerto): cada llamada vacía el buffer del SO
+            buffer = bytearray()
             while self.running:
-                if self.serial_conn.in_waiting > 0:
-                    linea = self.serial_conn.readline().decode('utf-8', errors='ignore').strip()
+                bloque = self.serial_conn.read(self.serial_conn.in_waiting or 1)
+                if not bloque:
+                    continue
+                buffer.extend(bloque)
+                
+                # Procesar solo las líneas completas; el resto queda en el buffer
+                fin = buffer.rfind(b'\n')
+                if fin < 0:
+                    continue
+                lineas = buffer[:fin].split(b'\n')
+                del buffer[:fin + 1]
+                
+                for linea in lineas:
+                    linea = linea.strip()
                     if linea:
                         self.procesar_linea(linea)
-                        
-                self.msleep(100)  # Pausa de 100ms
                 
         except Exception as e:
-            self.error_occurred.emit(f"Error de conexión: {str(e)}")
+            # Cerrar el puerto desde stop() interrumpe la lectura bloqueante
+            if not self._detenido:
+                self.error_occurred.emit(f"Error de conexión: {str(e)}")
             
     def procesar_linea(self, linea):
-        """Procesa datos del Arduino"""
-        timestamp = datetime.now()
+        """Procesa datos del Arduino (línea cruda como bytearray)"""
+        t = time.monotonic() - self.t0_mono
         
         try:
-            # Extraer humedad
-            if "Humedad:" in linea:
-                humedad = int(linea.split("Humedad:")[1].split('%')[0].strip())
-                self.datos['humedad'].append({
-                    'timestamp': timestamp,
-                    'valor': humedad
-                })
-                
-                # Mantener solo últimos 100 registros
-                if len(self.datos['humedad']) > 100:
-                    self.datos['humedad'] = self.datos['humedad'][-100:]
-                    
-            # Extraer temperatura
-            if "Temp:" in linea:
-                temp_str = linea.split("Temp:")[1].split('C')[0].strip()
-                if temp_str != "Error":
-                    temperatura = float(temp_str)
-                    self.datos['temperatura'].append({
-                        'timestamp': timestamp,
-                        'valor': temperatura
-                    })
-                    
-                    if len(self.datos['temperatura']) > 100:
-                        self.datos['temperatura'] = self.datos['temperatura'][-100:]
+            humedad, temperatura, evento = parse(np.frombuffer(linea, dtype=np.uint8))
             
-            # Detectar eventos
-            if "Riego iniciado" in linea:
-                self.datos['eventos'].append({
-                    'timestamp': timestamp,
-                    'tipo': 'riego_iniciado',
-                    'descripcion': 'Bomba activada'
-                })
-                self.datos['estadisticas']['total_riegos'] += 1
-                self.datos['estadisticas']['ultimo_riego'] = timestamp.strftime("%H:%M:%S")
+            with QMutexLocker(self.mutex):
+                # Guardar humedad
+                if humedad >= 0:
+                    idx = self.hum_head
+                    self.hum_val[idx] = humedad
+                    self.hum_ts[idx] = t
+                    self.hum_head = (idx + 1) % MAX_MUESTRAS
+                    self.hum_count = min(self.hum_count + 1, MAX_MUESTRAS)
+                    
+                # Guardar temperatura
+                if not np.isnan(temperatura):
+                    idx = self.temp_head
+                    self.temp_val[idx] = temperatura
+                    self.temp_ts[idx] = t
+                    self.temp_head = (idx + 1) % MAX_MUESTRAS
+                    self.temp_count = min(self.temp_count + 1, MAX_MUESTRAS)
                 
-            elif "Bomba OFF" in linea:
-                self.datos['eventos'].append({
-                    'timestamp': timestamp,
-                    'tipo': 'riego_terminado',
-                    'descripcion': 'Bomba desactivada'
-                })
-            
-            # Actualizar estadísticas
-            self.actualizar_estadisticas()
-            
-            # Emitir señal con datos actualizados
-            self.data_updated.emit(self.datos.copy())
+                # Registrar eventos
+                if evento:
+                    self.eventos.append((t, evento))
+                
+                if evento == EVENTO_RIEGO_INICIADO:
+                    self.estadisticas['total_riegos'] += 1
+                    self.estadisticas['ultimo_riego'] = datetime.now().strftime("%H:%M:%S")
+                
+                # Actualizar estadísticas
+                self.actualizar_estadisticas()
+                
+                # Marcar datos pendientes para el próximo refresco de la UI
+                self.hay_datos_nuevos = True
             
         except Exception as e:
             self.error_occurred.emit(f"Error procesando datos: {str(e)}")
     
     def actualizar_estadisticas(self):
         """Actualiza estadísticas generales"""
-        if self.datos['humedad']:
-            valores = [d['valor'] for d in self.datos['humedad']]
-            self.datos['estadisticas']['humedad_promedio'] = sum(valores) / len(valores)
-        
-        if self.datos['temperatura']:
-            valores = [d['valor'] for d in self.datos['temperatura']]
-            self.datos['estadisticas']['temperatura_promedio'] = sum(valores) / len(valores)
+        estadisticas = self.estadisticas
+        if self.hum_count:
+            media, minimo, maximo = summarize(self.hum_val[:self.hum_count], self.hum_count, self.hum_hist)
+            estadisticas['humedad_promedio'] = media
+            estadisticas['humedad_min'] = minimo
+            estadisticas['humedad_max'] = maximo
+        
+        if self.temp_count:
+            media, minimo, maximo = resumen(self.temp_val[:self.temp_count], self.temp_count)
+            estadisticas['temperatura_promedio'] = media
+            estadisticas['temperatura_min'] = minimo
+            estadisticas['temperatura_max'] = maximo
+    
+    @staticmethod
+    def copia_ordenada(buffer, head, count):
+        """Copia el buffer circular ordenado de la muestra más antigua a la más reciente"""
+        if count < MAX_MUESTRAS:
+            return buffer[:count].copy()
+        return np.roll(buffer, -head)
+    
+    def obtener_datos(self):
+        """Construye un Snapshot de los datos actuales (llamar con el mutex tomado)"""
+        return Snapshot(
+            hum_ts=self.copia_ordenada(self.hum_ts, self.hum_head, self.hum_count),
+            hum_view=self.copia_ordenada(self.hum_val, self.hum_head, self.hum_count),
+            temp_ts=self.copia_ordenada(self.temp_ts, self.temp_head, self.temp_count),
+            temp_view=self.copia_ordenada(self.temp_val, self.temp_head, self.temp_count),
+            hum_hist=self.hum_hist.copy(),
+            stats=dict(self.estadisticas),
+            t0_wall=self.t0_wall
+        )
+    
+    def obtener_eventos(self):
+        """Devuelve una copia del historial de eventos [(t, código EVENTO_*), ...]"""
+        with QMutexLocker(self.mutex):
+            return list(self.eventos)
+    
+    def publicar_snapshot(self):
+        """Emite los datos más recientes si hubo cambios desde el último refresco"""
+        with QMutexLocker(self.mutex):
+            if not self.hay_datos_nuevos:
+                return
+            self.hay_datos_nuevos = False
+            snap = self.obtener_datos()
+        
+        self.data_updated.emit(snap.hum_view, snap.temp_view, snap)
     
     def stop(self):
         """Detiene la recolección"""
+        self._detenido = True
         self.running = False
         if self.serial_conn:
             self.serial_conn.close()
@@ -134,6 +235,13 @@ class MatplotlibWidget(QWidget):
     """Widget personalizado para gráficos matplotlib"""
     def __init__(self, parent=None):
         super().__init__(parent)
+        
+        # Configurar estilo (antes de crear los ejes)
+        try:
+            plt.style.use('seaborn-v0_8-whitegrid')
+        except:
+            plt.style.use('default')
+        
         self.figure = Figure(figsize=(12, 8))
         self.canvas = FigureCanvas(self.figure)
         
@@ -141,61 +249,136 @@ class MatplotlibWidget(QWidget):
         layout.addWidget(self.canvas)
         self.setLayout(layout)
         
-        # Configurar estilo
-        try:
-            plt.style.use('seaborn-v0_8-whitegrid')
-        except:
-            plt.style.use('default')
-        
-    def actualizar_graficos(self, datos):
-        """Actualiza todos los gráficos con nuevos datos"""
-        self.figure.clear()
+        # Fondo estático para blitting (se captura en cada redibujado completo)
+        self._bg = None
+        self.crear_graficos()
+        self.canvas.mpl_connect('draw_event', self._on_draw)
         
-        # Crear subplots
+    def crear_graficos(self):
+        """Crea ejes y artistas una sola vez; luego solo se actualizan sus datos"""
         gs = self.figure.add_gridspec(2, 2, hspace=0.3, wspace=0.3)
         
         # 1. Gráfico de humedad
-        ax1 = self.figure.add_subplot(gs[0, :])
-        if datos['humedad']:
-            timestamps = [d['timestamp'] for d in datos['humedad']]
-            valores = [d['valor'] for d in datos['humedad']]
-            
-            ax1.plot(timestamps, valores, marker='o', linewidth=2, color='#2E8B57', markersize=4)
-            ax1.axhline(y=30, color='red', linestyle='--', alpha=0.7, label='Umbral Riego (30%)')
-            ax1.axhline(y=45, color='green', linestyle='--', alpha=0.7, label='Umbral Satisfecho (45%)')
-            ax1.set_title('Humedad del Suelo en Tiempo Real', fontweight='bold', fontsize=14)
-            ax1.set_ylabel('Humedad (%)')
-            ax1.set_ylim(0, 100)
-            ax1.legend()
-            ax1.grid(True, alpha=0.3)
-            
-            # Formato de fechas en eje X
-            if len(timestamps) > 10:
-                ax1.tick_params(axis='x', rotation=45)
+        self.ax1 = self.figure.add_subplot(gs[0, :])
+        self.line_hum, = self.ax1.plot([], [], marker='o', linewidth=2, color='#2E8B57',
+                                       markersize=4, animated=True)
+        self.thr_low = self.ax1.axhline(y=30, color='red', linestyle='--', alpha=0.7, label='Umbral Riego (30%)')
+        self.thr_high = self.ax1.axhline(y=45, color='green', linestyle='--', alpha=0.7, label='Umbral Satisfecho (45%)')
+        self.ax1.set_title('Humedad del Suelo en Tiempo Real', fontweight='bold', fontsize=14)
+        self.ax1.set_ylabel('Humedad (%)')
+        self.ax1.set_ylim(0, 100)
+        self.ax1.legend()
+        self.ax1.grid(True, alpha=0.3)
+        self.ax1.xaxis_date()
+        self.ax1.tick_params(axis='x', rotation=45)
         
         # 2. Gráfico de temperatura
-        ax2 = self.figure.add_subplot(gs[1, 0])
-        if datos['temperatura']:
-            timestamps = [d['timestamp'] for d in datos['temperatura']]
-            valores = [d['valor'] for d in datos['temperatura']]
-            
-            ax2.plot(timestamps, valores, marker='s', linewidth=2, color='#FF6347', markersize=4)
-            ax2.set_title('🌡️ Temperatura', fontweight='bold')
-            ax2.set_ylabel('Temperatura (°C)')
-            ax2.grid(True, alpha=0.3)
-            ax2.tick_params(axis='x', rotation=45)
-        
-        # 3. Distribución de humedad
-        ax3 = self.figure.add_subplot(gs[1, 1])
-        if datos['humedad']:
-            valores = [d['valor'] for d in datos['humedad']]
-            ax3.hist(valores, bins=15, alpha=0.7, color='#2E8B57', edgecolor='black')
-            ax3.axvline(x=30, color='red', linestyle='--', alpha=0.7)
-            ax3.axvline(x=45, color='green', linestyle='--', alpha=0.7)
-            ax3.set_title('📊 Distribución Humedad', fontweight='bold')
-            ax3.set_xlabel('Humedad (%)')
-            ax3.set_ylabel('Frecuencia')
-        
+        self.ax2 = self.figure.add_subplot(gs[1, 0])
+        self.line_temp, = self.ax2.plot([], [], marker='s', linewidth=2, color='#FF6347',
+                                        markersize=4, animated=True)
+        self.ax2.set_title('🌡️ Temperatura', fontweight='bold')
+        self.ax2.set_ylabel('Temperatura (°C)')
+        self.ax2.set_ylim(0, 40)
+        self.ax2.grid(True, alpha=0.3)
+        self.ax2.xaxis_date()
+        self.ax2.tick_params(axis='x', rotation=45)
+        
+        # 3. Distribución de humedad (bins fijos 0-100, calculados por summarize)
+        self.ax3 = self.figure.add_subplot(gs[1, 1])
+        self.bordes_hist = np.linspace(0, 100, NUM_BINS + 1)
+        self.barras_hist = self.ax3.bar(self.bordes_hist[:-1], np.zeros(NUM_BINS), width=np.diff(self.bordes_hist),
+                                        align='edge', alpha=0.7, color='#2E8B57', edgecolor='black',
+                                        animated=True)
+        self.ax3.axvline(x=30, color='red', linestyle='--', alpha=0.7)
+        self.ax3.axvline(x=45, color='green', linestyle='--', alpha=0.7)
+        self.ax3.set_title('📊 Distribución Humedad', fontweight='bold')
+        self.ax3.set_xlabel('Humedad (%)')
+        self.ax3.set_ylabel('Frecuencia')
+        self.ax3.set_xlim(0, 100)
+        self.ax3.set_ylim(0, 10)
+        
+        self.artistas = [self.line_hum, self.line_temp, *self.barras_hist]
+    
+    def _on_draw(self, event):
+        """Captura el fondo tras un redibujado completo y pinta los artistas animados"""
+        # savefig también emite draw_event (sobre otro canvas y resolución): se ignora
+        if event.canvas is not self.canvas or self.canvas.is_saving():
+            return
+        self._bg = self.canvas.copy_from_bbox(self.figure.bbox)
+        self._dibujar_artistas()
+    
+    def _dibujar_artistas(self):
+        """Dibuja los artistas que cambian con cada actualización"""
+        for artista in self.artistas:
+            artista.axes.draw_artist(artista)
+    
+    @staticmethod
+    def _ajustar_eje_x(ax, x):
+        """Amplía el eje X de tiempo cuando los datos salen de él; devuelve True si cambió"""
+        if not len(x):
+            return False
+        xmin, xmax = ax.get_xlim()
+        if x[0] >= xmin and x[-1] <= xmax:
+            return False
+        margen = max((x[-1] - x[0]) * 0.25, 1 / 1440)  # al menos 1 minuto
+        ax.set_xlim(x[0], x[-1] + margen)
+        return True
+    
+    @staticmethod
+    def _ajustar_eje_y(ax, y, margen):
+        """Amplía el eje Y cuando los datos salen de él; devuelve True si cambió"""
+        if not len(y):
+            return False
+        ymin, ymax = ax.get_ylim()
+        vmin, vmax = float(y.min()), float(y.max())
+        if vmin >= ymin and vmax <= ymax:
+            return False
+        ax.set_ylim(min(ymin, vmin - margen), max(ymax, vmax + margen))
+        return True
+    
+    def _ajustar_temperatura(self, datos):
+        """Reescala el eje Y de temperatura solo si min/max salen del rango o este queda muy holgado"""
+        if not len(datos.temp_view):
+            return False
+        tmin, tmax = datos.stats['temperatura_min'], datos.stats['temperatura_max']
+        ymin, ymax = self.ax2.get_ylim()
+        dentro = ymin <= tmin and tmax <= ymax
+        holgado = (ymax - ymin) > 4 * max(tmax - tmin, MARGEN_TEMPERATURA)
+        if dentro and not holgado:
+            return False
+        self.ax2.set_ylim(tmin - MARGEN_TEMPERATURA, tmax + MARGEN_TEMPERATURA)
+        return True
+    
+    def actualizar_graficos(self, datos):
+        """Actualiza los datos de los gráficos y los repinta mediante blitting"""
+        x_hum = mdates.date2num(epoch_a_fechas(datos.hum_ts, datos.t0_wall))
+        x_temp = mdates.date2num(epoch_a_fechas(datos.temp_ts, datos.t0_wall))
+        self.line_hum.set_data(x_hum, datos.hum_view)
+        self.line_temp.set_data(x_temp, datos.temp_view)
+        
+        conteos = datos.hum_hist
+        for barra, conteo in zip(self.barras_hist, conteos):
+            barra.set_height(conteo)
+        
+        # Solo se redibuja la figura completa si cambian los límites de algún eje
+        redibujar = self._ajustar_eje_x(self.ax1, x_hum)
+        redibujar |= self._ajustar_eje_x(self.ax2, x_temp)
+        redibujar |= self._ajustar_temperatura(datos)
+        redibujar |= self._ajustar_eje_y(self.ax3, conteos, max(conteos.max() * 0.25, 1))
+        
+        if redibujar or self._bg is None:
+            self.canvas.draw()
+        else:
+            self.canvas.restore_region(self._bg)
+            self._dibujar_artistas()
+            self.canvas.blit(self.figure.bbox)
+    
+    def limpiar(self):
+        """Vacía los gráficos conservando ejes y decoración"""
+        self.line_hum.set_data([], [])
+        self.line_temp.set_data([], [])
+        for barra in self.barras_hist:
+            barra.set_height(0)
         self.canvas.draw()
     
     def exportar_imagen(self, filename):
@@ -212,7 +395,23 @@ class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.collector_thread = None
-        self.datos_actuales = {}
+        self.datos_actuales = None
+        
+        # Estilos precalculados del label de humedad: rojo, naranja, verde
+        self._hum_style = [
+            f"font-size: 12px; padding: 5px; background-color: {color}; color: white; border-radius: 5px; margin: 2px; font-weight: bold;"
+            for color in ("#e74c3c", "#f39c12", "#27ae60")
+        ]
+        self._hum_tier = -1
+        
+        # Últimos valores mostrados en los labels (evita setText si no cambian)
+        self._last_hum = -1
+        self._last_temp = -999.0
+        self._last_total = -1
+        self._last_riego = None
+        
+        # Compilar parser y estadísticas en segundo plano antes de conectar
+        threading.Thread(target=precompilar_kernels, daemon=True).start()
         
         self.init_ui()
         self.setup_statusbar()
@@ -241,6 +440,11 @@ class MainWindow(QMainWindow):
         # Crear menú
         self.crear_menu()
         
+        # Refresco de la UI a ritmo fijo (4 Hz), independiente del ritmo serial
+        self.ui_timer = QTimer(self)
+        self.ui_timer.timeout.connect(self._pull_snapshot)
+        self.ui_timer.start(250)
+        
     def crear_panel_control(self):
         """Crea el panel de control izquierdo"""
         panel = QWidget()
@@ -254,9 +458,16 @@ class MainWindow(QMainWindow):
         puerto_layout = QHBoxLayout()
         puerto_layout.addWidget(QLabel("Puerto:"))
         self.puerto_combo = QComboBox()
-        self.puerto_combo.addItems(['COM1', 'COM2', 'COM3', 'COM4', 'COM5', 'COM6', 'COM7', 'COM8'])
-        self.puerto_combo.setCurrentText('COM7')
+        self.puerto_combo.setEditable(True)  # Permite escribir un puerto no detectado
         puerto_layout.addWidget(self.puerto_combo)
+        
+        self.btn_refrescar_puertos = QPushButton("🔄")
+        self.btn_refrescar_puertos.setToolTip("Buscar puertos serie")
+        self.btn_refrescar_puertos.setFixedWidth(32)
+        self.btn_refrescar_puertos.clicked.connect(self.actualizar_puertos)
+        puerto_layout.addWidget(self.btn_refrescar_puertos)
+        
+        self.actualizar_puertos()
         conn_layout.addLayout(puerto_layout)
         
         # Botones de conexión
@@ -320,7 +531,8 @@ class MainWindow(QMainWindow):
         log_group = QGroupBox("📝 Log de Eventos")
         log_layout = QVBoxLayout(log_group)
         
-        self.log_text = QTextEdit()
+        self.log_text = QPlainTextEdit()
+        self.log_text.setMaximumBlockCount(100)  # Mantener solo últimas 100 líneas
         self.log_text.setMaximumHeight(200)
         self.log_text.setStyleSheet("background-color: #2c3e50; color: #ecf0f1; font-family: monospace;")
         log_layout.addWidget(self.log_text)
@@ -332,6 +544,14 @@ class MainWindow(QMainWindow):
         
         return panel
     
+    def actualizar_puertos(self):
+        """Rellena la lista de puertos con los detectados por pyserial"""
+        actual = self.puerto_combo.currentText() or 'COM7'
+        self.puerto_combo.clear()
+        for p in list_ports.comports():
+            self.puerto_combo.addItem(p.device)
+        self.puerto_combo.setCurrentText(actual)
+    
     def crear_menu(self):
         """Crea la barra de menú"""
         menubar = self.menuBar()
@@ -396,6 +616,7 @@ class MainWindow(QMainWindow):
             self.btn_conectar.setEnabled(False)
             self.btn_desconectar.setEnabled(True)
             self.puerto_combo.setEnabled(False)
+            self.btn_refrescar_puertos.setEnabled(False)
             
             self.agregar_log(f"🔄 Conectando a {puerto}...")
             
@@ -411,38 +632,49 @@ class MainWindow(QMainWindow):
         self.btn_conectar.setEnabled(True)
         self.btn_desconectar.setEnabled(False)
         self.puerto_combo.setEnabled(True)
+        self.btn_refrescar_puertos.setEnabled(True)
         
         self.statusbar.showMessage('🔴 Desconectado')
         self.agregar_log("🛑 Desconectado del Arduino")
     
-    def actualizar_datos(self, datos):
+    def _pull_snapshot(self):
+        """Solicita al hilo de recolección el último snapshot de datos"""
+        if self.collector_thread:
+            self.collector_thread.publicar_snapshot()
+    
+    def actualizar_datos(self, humedad, temperatura, datos):
         """Actualiza la interface con nuevos datos"""
         self.datos_actuales = datos
         
         # Actualizar estadísticas
-        if datos['humedad']:
-            ultimo_humedad = datos['humedad'][-1]['valor']
-            self.lbl_humedad_actual.setText(f"💧 Humedad: {ultimo_humedad}%")
+        if len(humedad):
+            ultimo_humedad = int(humedad[-1])
+            if ultimo_humedad != self._last_hum:
+                self.lbl_humedad_actual.setText("💧 Humedad: %d%%" % ultimo_humedad)
+                self._last_hum = ultimo_humedad
             
-            # Color según nivel de humedad
-            if ultimo_humedad < 30:
-                color = "#e74c3c"  # Rojo
-            elif ultimo_humedad < 45:
-                color = "#f39c12"  # Naranja
-            else:
-                color = "#27ae60"  # Verde
-                
-            self.lbl_humedad_actual.setStyleSheet(f"font-size: 12px; padding: 5px; background-color: {color}; color: white; border-radius: 5px; margin: 2px; font-weight: bold;")
-        
-        if datos['temperatura']:
-            ultima_temp = datos['temperatura'][-1]['valor']
-            self.lbl_temp_actual.setText(f"🌡️ Temperatura: {ultima_temp:.1f}°C")
-        
-        self.lbl_total_riegos.setText(f"🚿 Total Riegos: {datos['estadisticas']['total_riegos']}")
+            # Color según nivel de humedad (solo se reaplica al cambiar de nivel)
+            tier = 0 if ultimo_humedad < 30 else 1 if ultimo_humedad < 45 else 2
+            if tier != self._hum_tier:
+                self.lbl_humedad_actual.setStyleSheet(self._hum_style[tier])
+                self._hum_tier = tier
+        
+        if len(temperatura):
+            ultima_temp = round(float(temperatura[-1]), 1)
+            if ultima_temp != self._last_temp:
+                self.lbl_temp_actual.setText("🌡️ Temperatura: %.1f°C" % ultima_temp)
+                self._last_temp = ultima_temp
+        
+        total_riegos = datos.stats['total_riegos']
+        if total_riegos != self._last_total:
+            self.lbl_total_riegos.setText("🚿 Total Riegos: %d" % total_riegos)
+            self._last_total = total_riegos
         
         # Actualizar último riego
-        if datos['estadisticas']['ultimo_riego']:
-            self.lbl_ultimo_riego.setText(f"⏰ Último Riego: {datos['estadisticas']['ultimo_riego']}")
+        ultimo_riego = datos.stats['ultimo_riego']
+        if ultimo_riego and ultimo_riego != self._last_riego:
+            self.lbl_ultimo_riego.setText("⏰ Último Riego: %s" % ultimo_riego)
+            self._last_riego = ultimo_riego
         
         # Actualizar gráficos
         self.graficos_widget.actualizar_graficos(datos)
@@ -461,12 +693,7 @@ class MainWindow(QMainWindow):
     def agregar_log(self, mensaje):
         """Agrega mensaje al log"""
         timestamp = datetime.now().strftime("%H:%M:%S")
-        self.log_text.append(f"[{timestamp}] {mensaje}")
-        
-        # Mantener solo últimas 100 líneas
-        lines = self.log_text.toPlainText().split('\n')
-        if len(lines) > 100:
-            self.log_text.setPlainText('\n'.join(lines[-100:]))
+        self.log_text.appendPlainText(f"[{timestamp}] {mensaje}")
     
     def abrir_documentacion(self):
         """Abre la documentación en el navegador web"""
@@ -500,35 +727,24 @@ class MainWindow(QMainWindow):
         
         if filename:
             try:
-                # Crear DataFrame con todos los datos
-                datos_export = []
+                snap = self.datos_actuales
                 
-                # Combinar datos de humedad y temperatura
-                max_len = max(len(self.datos_actuales.get('humedad', [])), 
-                             len(self.datos_actuales.get('temperatura', [])))
-                
-                for i in range(max_len):
-                    fila = {}
-                    
-                    # Datos de humedad
-                    if i < len(self.datos_actuales.get('humedad', [])):
-                        fila['timestamp'] = self.datos_actuales['humedad'][i]['timestamp']
-                        fila['humedad'] = self.datos_actuales['humedad'][i]['valor']
-                    else:
-                        fila['humedad'] = None
-                    
-                    # Datos de temperatura
-                    if i < len(self.datos_actuales.get('temperatura', [])):
-                        if 'timestamp' not in fila:
-                            fila['timestamp'] = self.datos_actuales['temperatura'][i]['timestamp']
-                        fila['temperatura'] = self.datos_actuales['temperatura'][i]['valor']
-                    else:
-                        fila['temperatura'] = None
-                    
-                    datos_export.append(fila)
+                # Temperatura más cercana a cada muestra de humedad (tolerancia 2 s)
+                temperatura = np.full(len(snap.hum_ts), np.nan)
+                if len(snap.temp_ts):
+                    idx = np.searchsorted(snap.temp_ts, snap.hum_ts)
+                    izq = np.clip(idx - 1, 0, len(snap.temp_ts) - 1)
+                    der = np.clip(idx, 0, len(snap.temp_ts) - 1)
+                    dist_izq = np.abs(snap.temp_ts[izq] - snap.hum_ts)
+                    dist_der = np.abs(snap.temp_ts[der] - snap.hum_ts)
+                    cercano = np.where(dist_izq <= dist_der, izq, der)
+                    valido = np.minimum(dist_izq, dist_der) <= 2.0
+                    temperatura[valido] = snap.temp_view[cercano[valido]]
                 
-                df = pd.DataFrame(datos_export)
-                df.to_csv(filename, index=False)
+                # Timestamp en segundos epoch (hora de pared)
+                tabla = np.column_stack([snap.t0_wall + snap.hum_ts, snap.hum_view, temperatura])
+                np.savetxt(filename, tabla, fmt=['%.3f', '%.1f', '%.2f'], delimiter=',',
+                           header='timestamp,humedad,temperatura', comments='')
                 
                 QMessageBox.information(self, "Éxito", f"Datos CSV exportados a:\n{filename}")
                 self.agregar_log(f"💾 Datos CSV exportados: {filename}")
@@ -582,9 +798,8 @@ class MainWindow(QMainWindow):
                                    QMessageBox.Yes | QMessageBox.No)
         
         if reply == QMessageBox.Yes:
-            self.datos_actuales = {}
-            self.graficos_widget.figure.clear()
-            self.graficos_widget.canvas.draw()
+            self.datos_actuales = None
+            self.graficos_widget.limpiar()
             
             # Resetear labels
             self.lbl_humedad_actual.setText("💧 Humedad: -- %")
@@ -596,6 +811,11 @@ class MainWindow(QMainWindow):
             # Resetear estilo de humedad
             label_style = "font-size: 12px; padding: 5px; background-color: #ecf0f1; border-radius: 5px; margin: 2px;"
             self.lbl_humedad_actual.setStyleSheet(label_style)
+            self._hum_tier = -1
+            self._last_hum = -1
+            self._last_temp = -999.0
+            self._last_total = -1
+            self._last_riego = None
             
             self.agregar_log("🗑️ Datos limpiados")
     
@@ -0,0 +1,129 @@
+# parse_flat.py - Parser compilado (Numba) de las líneas seriales del Arduino
+import numpy as np
+from numba import njit
+
+# Códigos de evento devueltos por parse()
+EVENTO_NINGUNO = 0
+EVENTO_RIEGO_INICIADO = 1
+EVENTO_BOMBA_OFF = 2
+
+# Patrones buscados en la línea, como arrays de bytes
+_HUMEDAD = np.array(list(b"Humedad:"), dtype=np.uint8)
+_TEMP = np.array(list(b"Temp:"), dtype=np.uint8)
+_RIEGO_INICIADO = np.array(list(b"Riego iniciado"), dtype=np.uint8)
+_BOMBA_OFF = np.array(list(b"Bomba OFF"), dtype=np.uint8)
+
+# Firma explícita del parser; precompilar_parse() la compila por adelantado
+FIRMA_PARSE = 'Tuple((int32, float32, int32))(uint8[::1])'
+
+_ESPACIO = 32
+_MENOS = 45
+_PUNTO = 46
+_CERO = 48
+_NUEVE = 57
+
+
+@njit(cache=True)
+def _buscar(buf, patron):
+    """Devuelve el índice justo después del patrón, o -1 si no aparece"""
+    n = buf.shape[0]
+    m = patron.shape[0]
+    for i in range(n - m + 1):
+        j = 0
+        while j < m and buf[i + j] == patron[j]:
+            j += 1
+        if j == m:
+            return i + m
+    return -1
+
+
+@njit(cache=True)
+def _saltar_espacios(buf, i):
+    """Avanza el índice sobre los espacios en blanco"""
+    n = buf.shape[0]
+    while i < n and buf[i] == _ESPACIO:
+        i += 1
+    return i
+
+
+@njit(cache=True)
+def _leer_entero(buf, i):
+    """Lee un entero con signo desde el índice i; devuelve (valor, dígitos leídos)"""
+    n = buf.shape[0]
+    signo = 1
+    if i < n and buf[i] == _MENOS:
+        signo = -1
+        i += 1
+    valor = 0
+    digitos = 0
+    while i < n and _CERO <= buf[i] <= _NUEVE:
+        valor = valor * 10 + (buf[i] - _CERO)
+        digitos += 1
+        i += 1
+    return signo * valor, digitos
+
+
+@njit(cache=True)
+def _leer_decimal(buf, i):
+    """Lee un número decimal desde el índice i; devuelve NaN si no hay dígitos"""
+    n = buf.shape[0]
+    signo = 1.0
+    if i < n and buf[i] == _MENOS:
+        signo = -1.0
+        i += 1
+    valor = 0.0
+    digitos = 0
+    while i < n and _CERO <= buf[i] <= _NUEVE:
+        valor = valor * 10.0 + (buf[i] - _CERO)
+        digitos += 1
+        i += 1
+    if i < n and buf[i] == _PUNTO:
+        i += 1
+        escala = 0.1
+        while i < n and _CERO <= buf[i] <= _NUEVE:
+            valor += (buf[i] - _CERO) * escala
+            escala *= 0.1
+            digitos += 1
+            i += 1
+    if digitos == 0:
+        return np.nan
+    return signo * valor
+
+
+@njit(cache=True)
+def parse(buf):
+    """
+    Analiza una línea serial del Arduino (buf: uint8 contiguo y escribible).
+
+    Devuelve (humedad, temperatura, evento): humedad es -1 si la línea no la
+    contiene, temperatura es NaN si falta o el sensor reporta error, y evento
+    es uno de los códigos EVENTO_*.
+    """
+    humedad = -1
+    temperatura = np.nan
+    evento = EVENTO_NINGUNO
+
+    # Humedad: "Humedad: 45%"
+    i = _buscar(buf, _HUMEDAD)
+    if i >= 0:
+        valor, digitos = _leer_entero(buf, _saltar_espacios(buf, i))
+        if digitos > 0:
+            humedad = valor
+
+    # Temperatura: "Temp: 23.40C" ("Temp: Error" / "Temp: nan" se ignoran)
+    i = _buscar(buf, _TEMP)
+    if i >= 0:
+        temperatura = _leer_decimal(buf, _saltar_espacios(buf, i))
+
+    # Eventos de la bomba
+    if _buscar(buf, _RIEGO_INICIADO) >= 0:
+        evento = EVENTO_RIEGO_INICIADO
+    elif _buscar(buf, _BOMBA_OFF) >= 0:
+        evento = EVENTO_BOMBA_OFF
+
+    return humedad, temperatura, evento
+
+
+def precompilar_parse():
+    """Compila parse para FIRMA_PARSE (o la carga del caché en disco)"""
+    parse.compile(FIRMA_PARSE)
@@ -0,0 +1,47 @@
+# stats_kernels.py - Kernels estadísticos compilados (Numba) sobre los buffers circulares
+from numba import njit
+
+# Número de bins del histograma de humedad (rango fijo 0-100)
+NUM_BINS = 15
+
+# Firmas explícitas de los kernels; precompilar_estadisticas() las compila por adelantado
+FIRMA_SUMMARIZE = 'Tuple((float32, float32, float32))(float32[::1], int64, int64[::1])'
+FIRMA_RESUMEN = 'Tuple((float32, float32, float32))(float32[::1], int64)'
+
+
+@njit(cache=True, fastmath=True)
+def resumen(vals, n):
+    """Calcula en una sola pasada media, mínimo y máximo de los primeros n valores (sin histograma)"""
+    s = 0.0
+    mn = 1e9
+    mx = -1e9
+    for i in range(n):
+        v = vals[i]
+        s += v
+        if v < mn:
+            mn = v
+        if v > mx:
+            mx = v
+    return s / max(n, 1), mn, mx
+
+
+@njit(cache=True, fastmath=True)
+def summarize(vals, n, bins_out):
+    """
+    Calcula media, mínimo y máximo (vía resumen) e histograma de 15 bins
+    (0-100) de los primeros n valores. bins_out se reinicia y se rellena.
+    """
+    bins_out[:] = 0
+    for i in range(n):
+        b = int(vals[i] * 0.15)  # 15 bins sobre 0-100
+        if b == NUM_BINS:
+            b = NUM_BINS - 1  # 100% cae en el último bin
+        if 0 <= b < NUM_BINS:
+            bins_out[b] += 1
+    return resumen(vals, n)
+
+
+def precompilar_estadisticas():
+    """Compila summarize y resumen para sus firmas (o los carga del caché en disco)"""
+    summarize.compile(FIRMA_SUMMARIZE)
+    resumen.compile(FIRMA_RESUMEN)